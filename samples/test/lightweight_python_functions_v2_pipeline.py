@@ -75,9 +75,9 @@ def train(
         dataset_one_contents, dataset_two_contents, message
     )
 
-    with open(model.path, 'w') as output_file:
-        for i in range(num_steps):
-            output_file.write("Step {}\n{}\n=====\n".format(i, line))
+    with open(model.path, 'w', buffering=1 << 20) as output_file:
+        output_file.writelines(
+            f"Step {i}\n{line}\n=====\n" for i in range(num_steps))
 
     # Use `model` to get a Model artifact, which has a .metadata dictionary
     # to store arbitrary metadata for the output artifact.
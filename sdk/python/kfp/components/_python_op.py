@@ -497,8 +497,11 @@ def _func_to_component_spec_v2(
     from kfp.components import executor, executor_main
 
     imports_source = [
+        "import hashlib",
         "import json",
         "import inspect",
+        "import os",
+        "import shutil",
         "from typing import *"
     ]
 
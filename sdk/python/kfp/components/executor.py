@@ -11,37 +11,91 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import hashlib
 import json
 import inspect
-from typing import Any, Callable, Dict, Optional, Union
+import os
+import shutil
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 from kfp.components._python_op import InputPath, OutputPath
-from kfp.dsl.io_types import Artifact, Input, Output, create_runtime_artifact, is_artifact_annotation, is_input_artifact, is_output_artifact
+from kfp.dsl.io_types import Artifact, Input, InputAnnotation, Output, OutputAnnotation, create_runtime_artifact, get_io_artifact_annotation
 
 
 class Executor():
   """Executor executes v2-based Python function components."""
 
-  def __init__(self, executor_input: Dict, function_to_execute: Callable):
+  __slots__ = (
+      '_func',
+      '_input',
+      '_cache_dir',
+      '_input_parameters',
+      '_output_parameters',
+      '_input_artifact_specs',
+      '_output_artifact_specs',
+      '_input_artifacts',
+      '_output_artifacts',
+      '_created_dirs',
+      '_signature',
+      '_return_annotation',
+      '_annotations',
+      '_return_kind',
+      '_nt_pairs',
+      '_plan',
+      '_executor_output',
+  )
+
+  # Buffer size used when writing output artifact payloads.
+  _PAYLOAD_BUFFER_SIZE = 1 << 20
+
+  # Chunk size used when hashing input artifact contents for cache keys.
+  _HASH_CHUNK_SIZE = 1 << 20
+
+  # Kinds of function return annotations, resolved once per Executor.
+  _RETURN_KIND_SINGLE = 'single'
+  _RETURN_KIND_NAMED_TUPLE = 'named_tuple'
+
+  # Annotations of function arguments and return values that are parameters.
+  _PARAMETER_TYPES = (str, int, float)
+
+  # Maps output parameter value types to their executor output field.
+  _PARAMETER_VALUE_KEYS = {
+      str: 'stringValue',
+      int: 'intValue',
+      float: 'doubleValue',
+  }
+
+  def __init__(self,
+               executor_input: Dict,
+               function_to_execute: Callable,
+               cache_dir: Optional[str] = None):
     self._func = function_to_execute
     self._input = executor_input
+    self._cache_dir = cache_dir
+    self._input_parameters = self._input.get('inputs',
+                                             {}).get('parameters', {})
+    self._output_parameters = self._input.get('outputs',
+                                              {}).get('parameters', {})
+    self._input_artifact_specs = self._input.get('inputs',
+                                                 {}).get('artifacts', {})
+    self._output_artifact_specs = self._input.get('outputs',
+                                                  {}).get('artifacts', {})
+    # Artifacts are created on first use, see _load_input_artifact() and
+    # _load_output_artifact().
     self._input_artifacts: Dict[str, Artifact] = {}
     self._output_artifacts: Dict[str, Artifact] = {}
-
-    for name, artifacts in self._input.get('inputs', {}).get('artifacts',
-                                                             {}).items():
-      artifacts_list = artifacts.get('artifacts')
-      if artifacts_list:
-        self._input_artifacts[name] = self._make_input_artifact(
-            artifacts_list[0])
-
-    for name, artifacts in self._input.get('outputs', {}).get('artifacts',
-                                                              {}).items():
-      artifacts_list = artifacts.get('artifacts')
-      if artifacts_list:
-        self._output_artifacts[name] = self._make_output_artifact(
-            artifacts_list[0])
-
-    self._return_annotation = inspect.signature(self._func).return_annotation
+    self._created_dirs = set()
+    self._makedirs(os.path.dirname(self._input['outputs']['outputFile']))
+
+    self._signature = inspect.signature(self._func)
+    self._return_annotation = self._signature.return_annotation
+    self._annotations = getattr(self._func, '__annotations__', {})
+    self._return_kind = self._get_return_kind(self._return_annotation)
+    self._nt_pairs = ()
+    if self._return_kind == self._RETURN_KIND_NAMED_TUPLE:
+      self._nt_pairs = tuple(
+          (field, self._return_annotation.__annotations__[field])
+          for field in self._return_annotation._fields)
+    self._plan = self._make_plan()
     self._executor_output = {}
 
   @classmethod
@@ -50,47 +104,74 @@ class Executor():
 
   @classmethod
   def _make_output_artifact(cls, runtime_artifact: Dict):
-    import os
-    artifact = create_runtime_artifact(runtime_artifact)
-    os.makedirs(os.path.dirname(artifact.path), exist_ok=True)
-    return  artifact
+    return create_runtime_artifact(runtime_artifact)
+
+  def _load_input_artifact(self, name: str) -> Optional[Artifact]:
+    if name not in self._input_artifacts:
+      artifacts_list = self._input_artifact_specs.get(name,
+                                                      {}).get('artifacts')
+      if not artifacts_list:
+        return None
+      self._input_artifacts[name] = self._make_input_artifact(
+          artifacts_list[0])
+    return self._input_artifacts[name]
+
+  def _load_output_artifact(self, name: str) -> Optional[Artifact]:
+    if name not in self._output_artifacts:
+      artifacts_list = self._output_artifact_specs.get(name,
+                                                       {}).get('artifacts')
+      if not artifacts_list:
+        return None
+      self._output_artifacts[name] = self._make_output_artifact(
+          artifacts_list[0])
+    return self._output_artifacts[name]
+
+  def _makedirs(self, directory: str):
+    # Output artifacts frequently share a parent directory, so create each
+    # directory at most once per Executor. Paths without a directory part
+    # (e.g. relative file names) have nothing to create.
+    if directory and directory not in self._created_dirs:
+      os.makedirs(directory, exist_ok=True)
+      self._created_dirs.add(directory)
 
   def _get_input_artifact(self, name: str):
-    return self._input_artifacts.get(name)
+    return self._load_input_artifact(name)
 
   def _get_output_artifact(self, name: str):
-    return self._output_artifacts.get(name)
+    artifact = self._load_output_artifact(name)
+    if artifact is not None:
+      self._makedirs(os.path.dirname(artifact.path))
+    return artifact
 
   def _get_input_parameter_value(self, parameter_name: str):
-    parameter = self._input.get('inputs', {}).get('parameters',
-                                                  {}).get(parameter_name, None)
+    parameter = self._input_parameters.get(parameter_name)
     if parameter is None:
       return None
 
-    if parameter.get('stringValue'):
+    # Use membership checks so that empty strings and zeros are not dropped.
+    # Numeric values may already be decoded, or may arrive as strings (int64
+    # values are serialized as strings in proto JSON).
+    if 'stringValue' in parameter:
       return parameter['stringValue']
-    elif parameter.get('intValue'):
-      return int(parameter['intValue'])
-    elif parameter.get('doubleValue'):
-      return float(parameter['doubleValue'])
+    elif 'intValue' in parameter:
+      value = parameter['intValue']
+      return value if type(value) == int else int(value)
+    elif 'doubleValue' in parameter:
+      value = parameter['doubleValue']
+      return value if type(value) == float else float(value)
 
   def _get_output_parameter_path(self, parameter_name: str):
-    parameter_name = self._maybe_strip_path_suffix(parameter_name)
-    parameter = self._input.get('outputs',
-                                {}).get('parameters',
-                                        {}).get(parameter_name, None)
+    parameter = self._output_parameters.get(parameter_name)
     if parameter is None:
       return None
 
-    import os
     path = parameter.get('outputFile', None)
     if path:
-      os.makedirs(os.path.basename(path), exist_ok=True)
+      self._makedirs(os.path.dirname(path))
     return path
 
   def _get_output_artifact_path(self, artifact_name: str):
-    artifact_name = self._maybe_strip_path_suffix(artifact_name)
-    output_artifact = self._output_artifacts.get(artifact_name)
+    output_artifact = self._get_output_artifact(artifact_name)
     if not output_artifact:
       raise ValueError(
           'Failed to get output artifact path for artifact name {}'.format(
@@ -98,8 +179,7 @@ class Executor():
     return output_artifact.path
 
   def _get_input_artifact_path(self, artifact_name: str):
-    artifact_name = self._maybe_strip_path_suffix(artifact_name)
-    input_artifact = self._input_artifacts.get(artifact_name)
+    input_artifact = self._get_input_artifact(artifact_name)
     if not input_artifact:
       raise ValueError(
           'Failed to get input artifact path for artifact name {}'.format(
@@ -108,30 +188,30 @@ class Executor():
 
   def _write_output_parameter_value(self, name: str, value: Union[str, int,
                                                                   float]):
-    if type(value) == str:
-      output = {"stringValue": value}
-    elif type(value) == int:
-      output = {"intValue": value}
-    elif type(value) == float:
-      output = {"doubleValue": value}
-    else:
+    try:
+      value_key = self._PARAMETER_VALUE_KEYS[type(value)]
+    except KeyError:
       raise RuntimeError(
           'Expected value of type str, int or float, got {} instead for value {}'
           .format(type(value), value))
 
-    if not self._executor_output.get('parameters'):
-      self._executor_output['parameters'] = {}
-
-    self._executor_output['parameters'][name] = output
+    self._executor_output.setdefault('parameters', {})[name] = {
+        value_key: value
+    }
 
   def _write_output_artifact_payload(self, name: str, value: Any):
     path = self._get_output_artifact_path(name)
-    with open(path, 'w') as f:
-      f.write(str(value))
+    with open(path, 'w', buffering=self._PAYLOAD_BUFFER_SIZE) as f:
+      # Iterators (e.g. generators) are streamed chunk by chunk so that large
+      # payloads never have to be held in memory as a single string.
+      if isinstance(value, Iterator):
+        f.writelines(map(str, value))
+      else:
+        f.write(str(value))
 
   @classmethod
   def _is_parameter(cls, annotation: Any) -> bool:
-    return annotation in [str, int, float]
+    return annotation in cls._PARAMETER_TYPES
 
   @classmethod
   def _is_artifact(cls, annotation: Any) -> bool:
@@ -146,6 +226,14 @@ class Executor():
           annotation, '_fields') and hasattr(annotation, '__annotations__')
     return False
 
+  @classmethod
+  def _get_return_kind(cls, annotation: Any) -> Optional[str]:
+    if cls._is_parameter(annotation) or cls._is_artifact(annotation):
+      return cls._RETURN_KIND_SINGLE
+    if cls._is_named_tuple(annotation):
+      return cls._RETURN_KIND_NAMED_TUPLE
+    return None
+
   def _handle_single_return_value(self, output_name: str, annotation_type: Any,
                                   return_value: Any):
     if self._is_parameter(annotation_type):
@@ -162,35 +250,39 @@ class Executor():
           ' subclass of `Artifact`'.format(annotation_type))
 
   def _write_executor_output(self, func_output: Optional[Any] = None):
-    if self._output_artifacts:
-      self._executor_output['artifacts'] = {}
-
-    for name, artifact in self._output_artifacts.items():
-      runtime_artifact = {
-          "name": artifact.name,
-          "uri": artifact.uri,
-          "metadata": artifact.metadata,
+    # Output artifacts the function never accessed still report their
+    # metadata, but their directories are not created.
+    output_artifacts = {}
+    for name in self._output_artifact_specs:
+      artifact = self._load_output_artifact(name)
+      if artifact is not None:
+        output_artifacts[name] = artifact
+
+    if output_artifacts:
+      self._executor_output['artifacts'] = {
+          name: {
+              'artifacts': [{
+                  'name': artifact.name,
+                  'uri': artifact.uri,
+                  'metadata': artifact.metadata,
+              }]
+          } for name, artifact in output_artifacts.items()
       }
-      artifacts_list = {'artifacts': [runtime_artifact]}
-
-      self._executor_output['artifacts'][name] = artifacts_list
 
     if func_output is not None:
-      if self._is_parameter(self._return_annotation) or self._is_artifact(
-          self._return_annotation):
+      if self._return_kind == self._RETURN_KIND_SINGLE:
         # Note: single output is named `Output` in component.yaml.
         self._handle_single_return_value('Output', self._return_annotation,
                                          func_output)
-      elif self._is_named_tuple(self._return_annotation):
-        if len(self._return_annotation._fields) != len(func_output):
+      elif self._return_kind == self._RETURN_KIND_NAMED_TUPLE:
+        if len(self._nt_pairs) != len(func_output):
           raise RuntimeError(
               'Expected {} return values from function `{}`, got {}'.format(
-                  len(self._return_annotation._fields), self._func.__name__,
+                  len(self._nt_pairs), self._func.__name__,
                   len(func_output)))
-        for i in range(len(self._return_annotation._fields)):
-          field = self._return_annotation._fields[i]
-          field_type = self._return_annotation.__annotations__[field]
-          if type(func_output) == tuple:
+        is_plain_tuple = type(func_output) == tuple
+        for i, (field, field_type) in enumerate(self._nt_pairs):
+          if is_plain_tuple:
             field_value = func_output[i]
           else:
             field_value = getattr(func_output, field)
@@ -201,11 +293,10 @@ class Executor():
             ' subclass of `Artifact`, or a NamedTuple collection of these types.'
             .format(self._return_annotation))
 
-    import os
-    os.makedirs(os.path.dirname(self._input['outputs']['outputFile']),
-                exist_ok=True)
+    # json.dumps() uses the C encoder, which is considerably faster than the
+    # pure-Python iterencode() path taken by json.dump().
     with open(self._input['outputs']['outputFile'], 'w') as f:
-      f.write(json.dumps(self._executor_output))
+      f.write(json.dumps(self._executor_output, separators=(',', ':')))
 
   def _maybe_strip_path_suffix(self, name) -> str:
     if name.endswith('_path'):
@@ -214,32 +305,164 @@ class Executor():
       name = name[0:-len('_file')]
     return name
 
-  def execute(self):
-    annotations = inspect.getfullargspec(self._func).annotations
-
-    # Function arguments.
-    func_kwargs = {}
+  def _make_plan(self) -> List[Tuple[str, Callable[[str], Any], str]]:
+    """Resolves how each function argument is bound to its value.
 
-    for k, v in annotations.items():
+    Each entry holds the argument name, the getter for its value and the
+    input/output name passed to that getter. The plan is built once per
+    Executor so that execute() only needs to call the precomputed getters.
+    """
+    plan = []
+    for k, v in self._annotations.items():
       if k == 'return':
         continue
 
-      if v in [str, float, int]:
-        func_kwargs[k] = self._get_input_parameter_value(k)
-
-      if is_artifact_annotation(v):
-        if is_input_artifact(v):
-          func_kwargs[k] = self._get_input_artifact(k)
-        if is_output_artifact(v):
-          func_kwargs[k] = self._get_output_artifact(k)
+      if v in self._PARAMETER_TYPES:
+        plan.append((k, self._get_input_parameter_value, k))
+        continue
 
+      # Classify Input[T]/Output[T] with a single annotation inspection.
+      io_annotation = get_io_artifact_annotation(v)
+      if io_annotation is InputAnnotation:
+        plan.append((k, self._get_input_artifact, k))
+      elif io_annotation is OutputAnnotation:
+        plan.append((k, self._get_output_artifact, k))
       elif isinstance(v, OutputPath):
-        if v.type in [str, float, int]:
-          func_kwargs[k] = self._get_output_parameter_path(k)
+        name = self._maybe_strip_path_suffix(k)
+        if v.type in self._PARAMETER_TYPES:
+          plan.append((k, self._get_output_parameter_path, name))
         else:
-          func_kwargs[k] = self._get_output_artifact_path(k)
+          plan.append((k, self._get_output_artifact_path, name))
       elif isinstance(v, InputPath):
-        func_kwargs[k] = self._get_input_artifact_path(k)
+        plan.append((k, self._get_input_artifact_path,
+                     self._maybe_strip_path_suffix(k)))
+
+    return plan
+
+  def _is_cacheable(self) -> bool:
+    # Only outputs recorded in the executor output file can be restored from
+    # the cache. Artifact payloads and files written to OutputPath parameters
+    # cannot.
+    if self._output_artifact_specs:
+      return False
+    return not any(
+        isinstance(v, OutputPath) for v in self._annotations.values())
+
+  def _compute_cache_key(self) -> Optional[str]:
+    """Computes a cache key from the function source and its inputs.
+
+    Input artifacts are keyed by the contents of their local files or
+    directories, since artifact URIs are not unique per execution (e.g.
+    importer artifacts). Only the source of the function itself is hashed, so
+    changes to helpers or globals it uses do not invalidate the cache.
+    Returns None if the function source or an input artifact's local contents
+    are not available.
+    """
+    try:
+      func_source = inspect.getsource(self._func)
+    except (OSError, TypeError):
+      return None
 
+    inputs = {
+        'parameters': self._input_parameters,
+        'artifacts': self._input_artifact_specs,
+    }
+    # Every item is length-prefixed so that adjacent items cannot run into
+    # each other and produce the same key for different inputs.
+    hasher = hashlib.blake2b(digest_size=32)
+    self._update_hash(hasher, func_source.encode())
+    self._update_hash(hasher, json.dumps(inputs, sort_keys=True).encode())
+
+    for name in sorted(self._input_artifact_specs):
+      artifact = self._load_input_artifact(name)
+      if artifact is None:
+        continue
+      path = artifact.path
+      if not path or not os.path.exists(path):
+        return None
+      self._update_hash(hasher, name.encode())
+      try:
+        self._hash_path(hasher, path)
+      except OSError:
+        return None
+    return hasher.hexdigest()
+
+  @classmethod
+  def _update_hash(cls, hasher, data: bytes):
+    hasher.update(len(data).to_bytes(8, 'big'))
+    hasher.update(data)
+
+  @classmethod
+  def _hash_path(cls, hasher, path: str):
+    if not os.path.isdir(path):
+      cls._update_hash(hasher, b'file')
+      cls._update_hash(hasher, cls._hash_file(path))
+      return
+
+    entries = []
+    for root, dirs, files in os.walk(path):
+      dirs.sort()
+      for file_name in sorted(files):
+        file_path = os.path.join(root, file_name)
+        entries.append((os.path.relpath(file_path, path).encode(),
+                        cls._hash_file(file_path)))
+    cls._update_hash(hasher, b'directory')
+    cls._update_hash(hasher, str(len(entries)).encode())
+    for relpath, file_digest in entries:
+      cls._update_hash(hasher, relpath)
+      cls._update_hash(hasher, file_digest)
+
+  @classmethod
+  def _hash_file(cls, path: str) -> bytes:
+    hasher = hashlib.blake2b(digest_size=32)
+    with open(path, 'rb') as f:
+      for chunk in iter(lambda: f.read(cls._HASH_CHUNK_SIZE), b''):
+        hasher.update(chunk)
+    return hasher.digest()
+
+  def _get_cache_path(self) -> Optional[str]:
+    if not self._cache_dir or not self._is_cacheable():
+      return None
+    cache_key = self._compute_cache_key()
+    if cache_key is None:
+      return None
+    return os.path.join(self._cache_dir, cache_key + '.json')
+
+  def _read_cache(self, cache_path: str, output_file: str) -> bool:
+    # The cache is best-effort: any failure to read it falls back to running
+    # the function.
+    try:
+      if not os.path.exists(cache_path):
+        return False
+      shutil.copyfile(cache_path, output_file)
+      return True
+    except OSError:
+      return False
+
+  def _write_cache(self, cache_path: str, output_file: str):
+    # Write to a temporary file first so that concurrent executions never
+    # observe a partially written cache entry. Failures are ignored, since the
+    # function has already run successfully.
+    tmp_path = '{}.{}.tmp'.format(cache_path, os.getpid())
+    try:
+      self._makedirs(self._cache_dir)
+      shutil.copyfile(output_file, tmp_path)
+      os.replace(tmp_path, cache_path)
+    except OSError:
+      try:
+        os.remove(tmp_path)
+      except OSError:
+        pass
+
+  def execute(self):
+    output_file = self._input['outputs']['outputFile']
+    cache_path = self._get_cache_path()
+    if cache_path and self._read_cache(cache_path, output_file):
+      return
+
+    func_kwargs = {k: getter(name) for k, getter, name in self._plan}
     result = self._func(**func_kwargs)
     self._write_executor_output(result)
+
+    if cache_path:
+      self._write_cache(cache_path, output_file)
@@ -17,6 +17,7 @@ from kfp.components.executor import Executor
 def executor_main():
   import argparse
   import json
+  import os
 
   parser = argparse.ArgumentParser(description='Process some integers.')
   parser.add_argument('--executor_input', type=str)
@@ -26,7 +27,13 @@ def executor_main():
   executor_input = json.loads(args.executor_input)
   function_to_execute = globals()[args.function_to_execute]
 
-  executor = Executor(executor_input=executor_input,
-                      function_to_execute=function_to_execute)
+  # KFP_EXECUTOR_CACHE_DIR opts in to caching executor outputs. The cache key
+  # covers the source of the function itself, its input parameters and the
+  # contents of its input artifacts, but not helper functions or globals the
+  # function uses; clear the cache directory when those change.
+  executor = Executor(
+      executor_input=executor_input,
+      function_to_execute=function_to_execute,
+      cache_dir=os.environ.get('KFP_EXECUTOR_CACHE_DIR'))
 
   executor.execute()
@@ -17,6 +17,7 @@ import os
 import tempfile
 from typing import Callable, NamedTuple, Optional
 import unittest
+from unittest import mock
 import json
 
 from kfp.components import executor, InputPath, OutputPath
@@ -90,18 +91,23 @@ class ExecutorTest(unittest.TestCase):
     self.maxDiff = None
     self._test_dir = tempfile.mkdtemp()
     io_types._GCS_LOCAL_MOUNT_PREFIX = self._test_dir + '/'
+    # Output parameter paths are created relative to the working directory.
+    self.addCleanup(os.chdir, os.getcwd())
+    os.chdir(self._test_dir)
     return super().setUp()
 
   def _get_executor(self,
                     func: Callable,
-                    executor_input: Optional[str] = None) -> executor.Executor:
+                    executor_input: Optional[str] = None,
+                    cache_dir: Optional[str] = None) -> executor.Executor:
     if executor_input is None:
       executor_input = _EXECUTOR_INPUT
 
     executor_input_dict = json.loads(executor_input % self._test_dir)
 
     return executor.Executor(executor_input=executor_input_dict,
-                             function_to_execute=func)
+                             function_to_execute=func,
+                             cache_dir=cache_dir)
 
   def test_input_parameter(self):
 
@@ -110,6 +116,37 @@ class ExecutorTest(unittest.TestCase):
 
     self._get_executor(test_func).execute()
 
+  def test_input_parameter_zero_values(self):
+    executor_input = """\
+    {
+      "inputs": {
+        "parameters": {
+          "empty_string": {
+            "stringValue": ""
+          },
+          "zero_int": {
+            "intValue": "0"
+          },
+          "zero_double": {
+            "doubleValue": 0.0
+          }
+        }
+      },
+      "outputs": {
+        "outputFile": "%s/output_metadata.json"
+      }
+    }
+    """
+
+    def test_func(empty_string: str, zero_int: int, zero_double: float):
+      self.assertEqual(empty_string, "")
+      self.assertEqual(zero_int, 0)
+      self.assertIsInstance(zero_int, int)
+      self.assertEqual(zero_double, 0.0)
+      self.assertIsInstance(zero_double, float)
+
+    self._get_executor(test_func, executor_input).execute()
+
   def test_input_artifact(self):
 
     def test_func(input_artifact_one: Input[Dataset]):
@@ -135,6 +172,15 @@ class ExecutorTest(unittest.TestCase):
 
     self._get_executor(test_func).execute()
 
+  def test_unused_output_artifact_directories_are_not_created(self):
+
+    def test_func(input_parameter: str):
+      pass
+
+    self._get_executor(test_func).execute()
+    self.assertFalse(os.path.exists(os.path.join(self._test_dir,
+                                                 'some-bucket')))
+
   def test_output_parameter(self):
 
     def test_func(output_parameter_path: OutputPath(str)):
@@ -144,6 +190,29 @@ class ExecutorTest(unittest.TestCase):
 
     self._get_executor(test_func).execute()
 
+  def test_output_parameter_without_directory(self):
+    executor_input = """\
+    {
+      "outputs": {
+        "parameters": {
+          "output_parameter": {
+            "outputFile": "output_parameter"
+          }
+        },
+        "outputFile": "output_metadata.json"
+      }
+    }
+    """
+
+    def test_func(output_parameter_path: OutputPath(str)):
+      self.assertEqual(output_parameter_path, 'output_parameter')
+
+    # Both paths are relative to the working directory, i.e. the test dir.
+    executor.Executor(executor_input=json.loads(executor_input),
+                      function_to_execute=test_func).execute()
+    self.assertTrue(
+        os.path.exists(os.path.join(self._test_dir, 'output_metadata.json')))
+
   def test_input_path_artifact(self):
 
     def test_func(input_artifact_one_path: InputPath('Dataset')):
@@ -162,6 +231,19 @@ class ExecutorTest(unittest.TestCase):
 
     self._get_executor(test_func).execute()
 
+  def test_path_arguments_with_file_suffix(self):
+
+    def test_func(input_artifact_one_file: InputPath('Dataset'),
+                  output_artifact_one_file: OutputPath('Model')):
+      self.assertEqual(
+          input_artifact_one_file,
+          os.path.join(self._test_dir, 'some-bucket/input_artifact_one'))
+      self.assertEqual(
+          output_artifact_one_file,
+          os.path.join(self._test_dir, 'some-bucket/output_artifact_one'))
+
+    self._get_executor(test_func).execute()
+
   def test_output_metadata(self):
 
     def test_func(output_artifact_two: Output[Metrics]):
@@ -313,6 +395,63 @@ class ExecutorTest(unittest.TestCase):
         },
     })
 
+  def test_executor_output_is_compact_json(self):
+    executor_input = """\
+    {
+      "inputs": {
+        "parameters": {
+          "message": {
+            "stringValue": "Hello"
+          }
+        }
+      },
+      "outputs": {
+        "parameters": {
+          "output": {
+            "outputFile": "gs://some-bucket/output"
+          }
+        },
+        "outputFile": "%s/output_metadata.json"
+      }
+    }
+    """
+
+    def test_func(message: str) -> str:
+      return message + ", World"
+
+    self._get_executor(test_func, executor_input).execute()
+    with open(os.path.join(self._test_dir, 'output_metadata.json'), 'r') as f:
+      self.assertEqual(f.read(),
+                       '{"parameters":{"Output":{"stringValue":"Hello, World"}}}')
+
+  def test_function_with_non_finite_float_output(self):
+    executor_input = """\
+    {
+      "outputs": {
+        "parameters": {
+          "output": {
+            "outputFile": "gs://some-bucket/output"
+          }
+        },
+        "outputFile": "%s/output_metadata.json"
+      }
+    }
+    """
+
+    def test_func() -> float:
+      return float('inf')
+
+    self._get_executor(test_func, executor_input).execute()
+    with open(os.path.join(self._test_dir, 'output_metadata.json'), 'r') as f:
+      output_metadata = json.loads(f.read())
+    self.assertDictEqual(output_metadata, {
+        "parameters": {
+            "Output": {
+                "doubleValue": float('inf')
+            }
+        },
+    })
+
   def test_artifact_output(self):
     executor_input = """\
     {
@@ -368,6 +507,36 @@ class ExecutorTest(unittest.TestCase):
       artifact_payload = f.read()
     self.assertEqual(artifact_payload, "Hello, World")
 
+  def test_artifact_output_from_generator(self):
+    executor_input = """\
+    {
+      "outputs": {
+        "artifacts": {
+          "Output": {
+            "artifacts": [
+              {
+                "name": "output",
+                "type": {
+                  "schemaTitle": "system.Artifact"
+                },
+                "uri": "gs://some-bucket/output"
+              }
+            ]
+          }
+        },
+        "outputFile": "%s/output_metadata.json"
+      }
+    }
+    """
+
+    def test_func() -> Artifact:
+      return ("line {}\n".format(i) for i in range(3))
+
+    self._get_executor(test_func, executor_input).execute()
+    with open(os.path.join(self._test_dir, 'some-bucket/output'), 'r') as f:
+      artifact_payload = f.read()
+    self.assertEqual(artifact_payload, "line 0\nline 1\nline 2\n")
+
   def test_named_tuple_output(self):
     executor_input = """\
     {
@@ -446,3 +615,297 @@ class ExecutorTest(unittest.TestCase):
                 'r') as f:
         artifact_payload = f.read()
       self.assertEqual(artifact_payload, "Dataset contents")
+
+  def test_cached_execution(self):
+    executor_input = """\
+    {
+      "inputs": {
+        "parameters": {
+          "first": {
+            "intValue": 40
+          },
+          "second": {
+            "intValue": 2
+          }
+        }
+      },
+      "outputs": {
+        "outputFile": "%s/output_metadata.json"
+      }
+    }
+    """
+    cache_dir = os.path.join(self._test_dir, 'cache')
+    calls = []
+
+    def test_func(first: int, second: int) -> int:
+      calls.append((first, second))
+      return first + second
+
+    for _ in range(2):
+      self._get_executor(test_func, executor_input, cache_dir).execute()
+      with open(os.path.join(self._test_dir, 'output_metadata.json'),
+                'r') as f:
+        output_metadata = json.loads(f.read())
+      self.assertDictEqual(output_metadata,
+                           {"parameters": {
+                               "Output": {
+                                   "intValue": 42
+                               }
+                           }})
+
+    self.assertEqual(calls, [(40, 2)])
+
+  def test_cached_execution_misses_on_different_parameters(self):
+    executor_input = """\
+    {
+      "inputs": {
+        "parameters": {
+          "first": {
+            "intValue": 40
+          }
+        }
+      },
+      "outputs": {
+        "outputFile": "%s/output_metadata.json"
+      }
+    }
+    """
+    cache_dir = os.path.join(self._test_dir, 'cache')
+    calls = []
+
+    def test_func(first: int) -> int:
+      calls.append(first)
+      return first
+
+    self._get_executor(test_func, executor_input, cache_dir).execute()
+    self._get_executor(test_func, executor_input.replace('40', '41'),
+                       cache_dir).execute()
+    with open(os.path.join(self._test_dir, 'output_metadata.json'), 'r') as f:
+      output_metadata = json.loads(f.read())
+
+    self.assertEqual(calls, [40, 41])
+    self.assertDictEqual(output_metadata,
+                         {"parameters": {
+                             "Output": {
+                                 "intValue": 41
+                             }
+                         }})
+
+  def test_cached_execution_misses_on_changed_input_artifact(self):
+    executor_input = """\
+    {
+      "inputs": {
+        "artifacts": {
+          "input_artifact_one": {
+            "artifacts": [
+              {
+                "metadata": {},
+                "name": "input_artifact_one",
+                "type": {
+                  "schemaTitle": "system.Dataset"
+                },
+                "uri": "gs://some-bucket/input_artifact_one"
+              }
+            ]
+          }
+        }
+      },
+      "outputs": {
+        "outputFile": "%s/output_metadata.json"
+      }
+    }
+    """
+    cache_dir = os.path.join(self._test_dir, 'cache')
+    input_path = os.path.join(self._test_dir, 'some-bucket/input_artifact_one')
+    os.makedirs(os.path.dirname(input_path))
+    calls = []
+
+    def test_func(input_artifact_one: Input[Dataset]) -> str:
+      with open(input_artifact_one.path, 'r') as f:
+        contents = f.read()
+      calls.append(contents)
+      return contents
+
+    for contents in ['first', 'second', 'second']:
+      with open(input_path, 'w') as f:
+        f.write(contents)
+      self._get_executor(test_func, executor_input, cache_dir).execute()
+
+    self.assertEqual(calls, ['first', 'second'])
+
+  def test_cached_execution_misses_on_shifted_file_boundary(self):
+    executor_input = """\
+    {
+      "inputs": {
+        "artifacts": {
+          "input_artifact_one": {
+            "artifacts": [
+              {
+                "metadata": {},
+                "name": "input_artifact_one",
+                "type": {
+                  "schemaTitle": "system.Dataset"
+                },
+                "uri": "gs://some-bucket/input_artifact_one"
+              }
+            ]
+          }
+        }
+      },
+      "outputs": {
+        "outputFile": "%s/output_metadata.json"
+      }
+    }
+    """
+    cache_dir = os.path.join(self._test_dir, 'cache')
+    input_dir = os.path.join(self._test_dir, 'some-bucket/input_artifact_one')
+    os.makedirs(input_dir)
+    calls = []
+
+    def test_func(input_artifact_one: Input[Dataset]) -> str:
+      contents = []
+      for file_name in ['a', 'b']:
+        with open(os.path.join(input_artifact_one.path, file_name), 'r') as f:
+          contents.append(f.read())
+      calls.append(contents)
+      return '|'.join(contents)
+
+    # Same file names and the same concatenated contents, but the boundary
+    # between the two files is shifted.
+    for a_contents, b_contents in [('Xb', 'Y'), ('X', 'bY')]:
+      for file_name, contents in [('a', a_contents), ('b', b_contents)]:
+        with open(os.path.join(input_dir, file_name), 'w') as f:
+          f.write(contents)
+      self._get_executor(test_func, executor_input, cache_dir).execute()
+
+    self.assertEqual(calls, [['Xb', 'Y'], ['X', 'bY']])
+
+  def test_cached_execution_skipped_for_output_artifacts(self):
+    cache_dir = os.path.join(self._test_dir, 'cache')
+    calls = []
+
+    def test_func(input_parameter: str):
+      calls.append(input_parameter)
+
+    for _ in range(2):
+      self._get_executor(test_func, cache_dir=cache_dir).execute()
+
+    self.assertEqual(len(calls), 2)
+    self.assertFalse(os.path.exists(cache_dir))
+
+  def test_cached_execution_skipped_for_output_path(self):
+    executor_input = """\
+    {
+      "outputs": {
+        "parameters": {
+          "output_parameter": {
+            "outputFile": "%s/output_parameter"
+          }
+        },
+        "outputFile": "%s/output_metadata.json"
+      }
+    }
+    """.replace('%s', '%(test_dir)s')
+    cache_dir = os.path.join(self._test_dir, 'cache')
+    calls = []
+
+    def test_func(output_parameter_path: OutputPath(str)):
+      calls.append(output_parameter_path)
+      with open(output_parameter_path, 'w') as f:
+        f.write('output')
+
+    for _ in range(2):
+      executor_input_dict = json.loads(executor_input %
+                                       {'test_dir': self._test_dir})
+      executor.Executor(executor_input=executor_input_dict,
+                        function_to_execute=test_func,
+                        cache_dir=cache_dir).execute()
+
+    self.assertEqual(len(calls), 2)
+    self.assertFalse(os.path.exists(cache_dir))
+
+  def test_cache_write_failure_does_not_fail_execution(self):
+    executor_input = """\
+    {
+      "outputs": {
+        "outputFile": "%s/output_metadata.json"
+      }
+    }
+    """
+    # A regular file where the cache directory should be makes every cache
+    # read and write fail.
+    cache_dir = os.path.join(self._test_dir, 'cache')
+    with open(cache_dir, 'w') as f:
+      f.write('not a directory')
+    calls = []
+
+    def test_func() -> str:
+      calls.append(None)
+      return 'Hello'
+
+    for _ in range(2):
+      self._get_executor(test_func, executor_input, cache_dir).execute()
+      with open(os.path.join(self._test_dir, 'output_metadata.json'),
+                'r') as f:
+        output_metadata = json.loads(f.read())
+      self.assertDictEqual(output_metadata,
+                           {"parameters": {
+                               "Output": {
+                                   "stringValue": "Hello"
+                               }
+                           }})
+
+    self.assertEqual(len(calls), 2)
+    self.assertEqual(sorted(os.listdir(self._test_dir)),
+                     ['cache', 'output_metadata.json'])
+
+  def test_failed_cache_write_removes_temporary_file(self):
+    executor_input = """\
+    {
+      "outputs": {
+        "outputFile": "%s/output_metadata.json"
+      }
+    }
+    """
+    cache_dir = os.path.join(self._test_dir, 'cache')
+
+    def test_func() -> str:
+      return 'Hello'
+
+    with mock.patch.object(executor.os, 'replace', side_effect=OSError):
+      self._get_executor(test_func, executor_input, cache_dir).execute()
+
+    self.assertEqual(os.listdir(cache_dir), [])
+
+  def test_named_tuple_artifact_field_with_path_suffix(self):
+    executor_input = """\
+    {
+      "outputs": {
+        "artifacts": {
+          "model_path": {
+            "artifacts": [
+              {
+                "name": "model_path",
+                "type": {
+                  "schemaTitle": "system.Model"
+                },
+                "uri": "gs://some-bucket/model_path"
+              }
+            ]
+          }
+        },
+        "outputFile": "%s/output_metadata.json"
+      }
+    }
+    """
+
+    # Return value outputs are named after the NamedTuple fields as is, so
+    # suffixes such as `_path` must not be stripped.
+    def test_func() -> NamedTuple('Outputs', [("model_path", Model)]):
+      return ("Model contents",)
+
+    self._get_executor(test_func, executor_input).execute()
+    with open(os.path.join(self._test_dir, 'some-bucket/model_path'),
+              'r') as f:
+      artifact_payload = f.read()
+    self.assertEqual(artifact_payload, "Model contents")